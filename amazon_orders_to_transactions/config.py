@@ -16,6 +16,24 @@ INPUT_COLUMNS = {
     'ORDER_STATUS': 'Order Status'
 }
 
+# Input columns parsed from strings to numbers during cleaning
+NUMERIC_COLUMNS = [
+    INPUT_COLUMNS['TOTAL_OWED'],
+    INPUT_COLUMNS['SHIPMENT_SUBTOTAL'],
+    INPUT_COLUMNS['SHIPMENT_SUBTOTAL_TAX'],
+    INPUT_COLUMNS['UNIT_PRICE'],
+    INPUT_COLUMNS['QUANTITY']
+]
+
+# Input columns that must be present for a row to be kept
+REQUIRED_COLUMNS = [
+    INPUT_COLUMNS['ORDER_ID'],
+    INPUT_COLUMNS['SHIP_DATE'],
+    INPUT_COLUMNS['TOTAL_OWED'],
+    INPUT_COLUMNS['SHIPMENT_SUBTOTAL'],
+    INPUT_COLUMNS['PRODUCT_NAME']
+]
+
 # Output CSV column names
 OUTPUT_COLUMNS = [
     'Ship Date',
@@ -26,29 +44,42 @@ OUTPUT_COLUMNS = [
     'Order URL',
 ]
 
-# Amazon URL template
-AMAZON_ORDER_URL_TEMPLATE = 'https://amazon.com/gp/your-account/order-details?orderID={}'
+# Amazon URL prefix (Order ID is appended)
+AMAZON_ORDER_URL_PREFIX = 'https://amazon.com/gp/your-account/order-details?orderID='
 
-# Data type specifications for pandas - use object for mixed/problematic columns
+# Data type specifications for pandas - amounts are read as strings and parsed in clean_data
 PANDAS_DTYPES = {
-    'Website': 'string',
-    'Order ID': 'string', 
-    'Currency': 'string',
-    'Unit Price': 'object',  # Handle 'Not Available' values
-    'Total Owed': 'object',  # Handle 'Not Available' values
-    'Shipment Item Subtotal': 'object',  # Handle 'Not Available' values
-    'Shipment Item Subtotal Tax': 'object',  # Handle 'Not Available' values
-    'Product Name': 'string',
-    'Quantity': 'object',  # Handle 'Not Available' values
-    'Order Status': 'string'
+    'Website': 'string[pyarrow]',
+    'Order ID': 'string[pyarrow]', 
+    'Currency': 'string[pyarrow]',
+    'Ship Date': 'string[pyarrow]',  # Parsed in clean_data, even if the reader inferred timestamps
+    'Unit Price': 'string[pyarrow]',  # Handle 'Not Available' values
+    'Total Owed': 'string[pyarrow]',  # Handle 'Not Available' values
+    'Shipment Item Subtotal': 'string[pyarrow]',  # Handle 'Not Available' values
+    'Shipment Item Subtotal Tax': 'string[pyarrow]',  # Handle 'Not Available' values
+    'Product Name': 'string[pyarrow]',
+    'Quantity': 'string[pyarrow]',  # Handle 'Not Available' values
+    'Order Status': 'string[pyarrow]'
 }
 
+# Amount strings parsed as numbers; anything else (e.g. 'Not Available') becomes NaN
+NUMBER_PATTERN = r'^[-+]?(\d+\.?\d*|\.\d+)([eE][-+]?\d+)?$'
+
+# Bytes of CSV read and cleaned per block when streaming order history
+CSV_BLOCK_SIZE = 16 * 1024 * 1024
+
 # Date parsing parameters
 DATE_PARSER_KWARGS = {
     'format': 'ISO8601',
     'utc': True
 }
 
+# Ship Date format written to (and re-read from) output transactions
+OUTPUT_DATE_FORMAT = '%Y-%m-%d'
+
+# ISO 8601 timestamps with a zone (e.g. 2025-08-05T03:08:19.087Z) that Arrow can cast directly
+ISO_TIMESTAMP_PATTERN = r'^\d{4}-\d{2}-\d{2}[T ]\d{2}:\d{2}:\d{2}(\.\d+)?(Z|[+-]\d{2}:?\d{2})$'
+
 # Returns CSV column mappings
 RETURNS_COLUMNS = {
     'ORDER_ID': 'OrderID',
@@ -58,7 +89,7 @@ RETURNS_COLUMNS = {
 
 # Returns data types
 RETURNS_DTYPES = {
-    'OrderID': 'string',
+    'OrderID': 'string[pyarrow]',
     'RefundCompletionDate': 'object',
     'AmountRefunded': 'object'
 }
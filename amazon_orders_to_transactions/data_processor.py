@@ -1,16 +1,27 @@
 """Core data processing module using pandas for Amazon order history conversion."""
 
+import csv
+import numpy as np
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
 import logging
 from pathlib import Path
 from typing import Optional
 
 from .config import (
     INPUT_COLUMNS, 
+    NUMERIC_COLUMNS,
+    REQUIRED_COLUMNS,
     OUTPUT_COLUMNS, 
-    AMAZON_ORDER_URL_TEMPLATE,
+    AMAZON_ORDER_URL_PREFIX,
+    CSV_BLOCK_SIZE,
     PANDAS_DTYPES,
     DATE_PARSER_KWARGS,
+    OUTPUT_DATE_FORMAT,
+    ISO_TIMESTAMP_PATTERN,
+    NUMBER_PATTERN,
     RETURNS_COLUMNS,
     RETURNS_DTYPES
 )
@@ -29,13 +40,17 @@ class OrderHistoryProcessor:
         try:
             self.logger.info(f"Loading CSV from {file_path}")
             
-            # Load CSV with pandas, handling encoding automatically
-            self.df = pd.read_csv(
+            # Load CSV with Arrow's multithreaded reader (which skips a UTF-8 BOM). pandas'
+            # pyarrow engine can't enable newlines_in_values, so call Arrow directly.
+            table = pa_csv.read_csv(
                 file_path,
-                dtype=PANDAS_DTYPES,
-                encoding='utf-8-sig',  # Handle BOM if present
-                low_memory=False
+                parse_options=pa_csv.ParseOptions(newlines_in_values=True),  # Quoted cells may span lines
+                convert_options=pa_csv.ConvertOptions(
+                    column_types={col: pa.string() for col in PANDAS_DTYPES},
+                    strings_can_be_null=True
+                )
             )
+            self.df = self._arrow_to_frame(table)
             
             self.logger.info(f"Loaded {len(self.df)} rows from CSV")
             return self.df
@@ -44,6 +59,59 @@ class OrderHistoryProcessor:
             self.logger.error(f"Failed to load CSV: {e}")
             raise
     
+    def load_clean_csv(self, file_path: str | Path, block_size: int = CSV_BLOCK_SIZE) -> pd.DataFrame:
+        """Stream Amazon order history CSV in blocks, cleaning each block as it is read."""
+        try:
+            self.logger.info(f"Streaming CSV from {file_path}")
+            
+            # Missing optional columns are filled with nulls below, but required ones must be present
+            with open(file_path, encoding='utf-8-sig', newline='') as f:
+                header = next(csv.reader(f), [])
+            missing_columns = [col for col in REQUIRED_COLUMNS if col not in header]
+            if missing_columns:
+                raise KeyError(missing_columns)
+            
+            # Only read the columns we declare types for, so later blocks can't break type inference
+            reader = pa_csv.open_csv(
+                file_path,
+                read_options=pa_csv.ReadOptions(block_size=block_size),
+                parse_options=pa_csv.ParseOptions(newlines_in_values=True),  # Quoted cells may span lines
+                convert_options=pa_csv.ConvertOptions(
+                    column_types={col: pa.string() for col in PANDAS_DTYPES},
+                    include_columns=list(PANDAS_DTYPES),
+                    include_missing_columns=True,
+                    strings_can_be_null=True
+                )
+            )
+            
+            initial_count = 0
+            chunks = []
+            for batch in reader:
+                initial_count += batch.num_rows
+                chunks.append(self._clean_chunk(self._arrow_to_frame(batch)))
+            
+            if not chunks:
+                chunks.append(self._clean_chunk(self._arrow_to_frame(reader.schema.empty_table())))
+            
+        except Exception as e:
+            self.logger.error(f"Failed to load CSV: {e}")
+            raise
+        
+        self.df = pd.concat(chunks, ignore_index=True)
+        self.logger.info(f"Loaded {initial_count} rows from CSV")
+        
+        dropped_count = initial_count - len(self.df)
+        if dropped_count > 0:
+            self.logger.warning(f"Dropped {dropped_count} rows with missing critical data")
+        
+        return self.df
+    
+    def _arrow_to_frame(self, data: pa.RecordBatch | pa.Table) -> pd.DataFrame:
+        """Convert Arrow CSV data to a DataFrame with the PANDAS_DTYPES column types."""
+        # Only cast the typed columns the file actually has; optional ones may be absent
+        dtypes = {col: dtype for col, dtype in PANDAS_DTYPES.items() if col in data.column_names}
+        return data.to_pandas(types_mapper=pd.ArrowDtype).astype(dtypes)
+    
     def clean_data(self) -> pd.DataFrame:
         """Clean and prepare data for processing."""
         if self.df is None:
@@ -51,31 +119,8 @@ class OrderHistoryProcessor:
         
         self.logger.info("Cleaning data...")
         
-        # Parse ship dates, handling 'Not Available' values
-        self.df[INPUT_COLUMNS['SHIP_DATE']] = pd.to_datetime(
-            self.df[INPUT_COLUMNS['SHIP_DATE']], 
-            errors='coerce',  # Convert invalid dates to NaT
-            **DATE_PARSER_KWARGS
-        )
-        
-        # Convert 'Not Available' and similar strings to NaN for numeric columns
-        numeric_columns = [INPUT_COLUMNS['TOTAL_OWED'], INPUT_COLUMNS['SHIPMENT_SUBTOTAL'], INPUT_COLUMNS['SHIPMENT_SUBTOTAL_TAX'], 'Unit Price', 'Quantity']
-        for col in numeric_columns:
-            if col in self.df.columns:
-                # Replace non-numeric strings with NaN, then convert to numeric
-                self.df[col] = pd.to_numeric(self.df[col], errors='coerce')
-        
-        # Remove any rows with missing critical data
-        required_columns = [
-            INPUT_COLUMNS['ORDER_ID'],
-            INPUT_COLUMNS['SHIP_DATE'],
-            INPUT_COLUMNS['TOTAL_OWED'],
-            INPUT_COLUMNS['SHIPMENT_SUBTOTAL'],
-            INPUT_COLUMNS['PRODUCT_NAME']
-        ]
-        
         initial_count = len(self.df)
-        self.df = self.df.dropna(subset=required_columns)
+        self.df = self._clean_chunk(self.df)
         dropped_count = initial_count - len(self.df)
         
         if dropped_count > 0:
@@ -83,6 +128,59 @@ class OrderHistoryProcessor:
         
         return self.df
     
+    def _clean_chunk(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Parse dates and amounts in a block of order rows and drop rows missing critical data."""
+        # Parse ship dates, handling 'Not Available' values
+        df[INPUT_COLUMNS['SHIP_DATE']] = self._parse_ship_dates(df[INPUT_COLUMNS['SHIP_DATE']])
+        
+        # Convert 'Not Available' and similar strings to NaN for numeric columns
+        for col in NUMERIC_COLUMNS:
+            if col in df.columns:
+                try:
+                    # Null out non-numeric strings, then cast the Arrow strings to float in one kernel
+                    values = pc.utf8_trim_whitespace(pa.array(df[col], type=pa.large_string()))
+                    is_number = pc.match_substring_regex(values, NUMBER_PATTERN)
+                    numbers = pc.if_else(is_number, values, pa.scalar(None, pa.large_string()))
+                    df[col] = pc.cast(numbers, pa.float64()).to_numpy(zero_copy_only=False)
+                except (pa.ArrowInvalid, pa.ArrowTypeError):
+                    # Already numeric or mixed objects; let pandas coerce them
+                    df[col] = pd.to_numeric(df[col], errors='coerce')
+        
+        # Remove any rows with missing critical data, building one mask across the
+        # required columns and taking once
+        missing = np.logical_or.reduce([df[col].isna().to_numpy() for col in REQUIRED_COLUMNS])
+        
+        return df[~missing]
+    
+    def _parse_ship_dates(self, ship_dates: pd.Series) -> pd.Series:
+        """Parse ISO 8601 ship date strings to UTC timestamps, with invalid dates as NaT."""
+        try:
+            # Cast zoned ISO timestamps (the usual Amazon format) in one Arrow kernel
+            values = pa.array(ship_dates, type=pa.large_string())
+            is_timestamp = pc.fill_null(pc.match_substring_regex(values, ISO_TIMESTAMP_PATTERN), False)
+            timestamps = pc.if_else(is_timestamp, values, pa.scalar(None, pa.large_string()))
+            parsed = pc.cast(timestamps, pa.timestamp('ns', tz='UTC')).to_pandas()
+            parsed = pd.Series(parsed.array, index=ship_dates.index, name=ship_dates.name)
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Out-of-range dates or non-string input; let pandas coerce them all
+            return pd.to_datetime(
+                ship_dates, 
+                errors='coerce',  # Convert invalid dates to NaT
+                **DATE_PARSER_KWARGS
+            )
+        
+        # Anything else that isn't missing (naive or date-only ISO, 'Not Available') goes
+        # through pandas, which treats naive values as UTC
+        other = ~is_timestamp.to_numpy(zero_copy_only=False) & ship_dates.notna().to_numpy()
+        if other.any():
+            parsed[other] = pd.to_datetime(
+                ship_dates[other], 
+                errors='coerce',  # Convert invalid dates to NaT
+                **DATE_PARSER_KWARGS
+            )
+        
+        return parsed
+    
     def group_transactions(self) -> pd.DataFrame:
         """Group items by Order ID and Shipment Item Subtotal."""
         if self.df is None:
@@ -90,15 +188,29 @@ class OrderHistoryProcessor:
         
         self.logger.info("Grouping transactions...")
         
+        # Factorize both keys to integer codes and combine them into one int64 group key
+        # so pandas hashes plain integers rather than strings and floats
+        order_codes, order_ids = pd.factorize(self.df[INPUT_COLUMNS['ORDER_ID']], sort=False)
+        subtotal_codes, subtotals = pd.factorize(self.df[INPUT_COLUMNS['SHIPMENT_SUBTOTAL']], sort=False)
+        group_keys = order_codes.astype(np.int64) * len(subtotals) + subtotal_codes
+        
+        # factorize codes missing keys as -1, which would alias another group's combined
+        # key, so drop those rows the way groupby drops NA keys
+        has_keys = (order_codes >= 0) & (subtotal_codes >= 0)
+        rows = self.df if has_keys.all() else self.df[has_keys]
+        
         # Group by Order ID and Shipment Item Subtotal to handle partial refunds/charges
-        grouped = self.df.groupby([
-            INPUT_COLUMNS['ORDER_ID'],
-            INPUT_COLUMNS['SHIPMENT_SUBTOTAL']
-        ]).agg({
+        grouped = rows.groupby(group_keys[has_keys], sort=False).agg({  # sort_by_date orders the result later
             INPUT_COLUMNS['SHIP_DATE']: 'first',  # Take first occurrence ship date
-            INPUT_COLUMNS['PRODUCT_NAME']: lambda x: '; '.join(x.astype(str)),  # Concatenate product names
+            INPUT_COLUMNS['PRODUCT_NAME']: '; '.join,  # Concatenate product names (already Arrow strings)
             INPUT_COLUMNS['TOTAL_OWED']: 'sum'  # Sum all Total Owed amounts in the group
-        }).reset_index()
+        })
+        
+        # Decode the combined keys back into Order ID and Shipment Item Subtotal columns
+        order_index, subtotal_index = np.divmod(grouped.index.to_numpy(), len(subtotals))
+        grouped.insert(0, INPUT_COLUMNS['ORDER_ID'], order_ids.take(order_index))
+        grouped.insert(1, INPUT_COLUMNS['SHIPMENT_SUBTOTAL'], subtotals.take(subtotal_index))
+        grouped = grouped.reset_index(drop=True)
         
         # Rename the aggregated Total Owed to Transaction Amount
         grouped = grouped.rename(columns={
@@ -110,32 +222,28 @@ class OrderHistoryProcessor:
     
     def generate_order_urls(self, df: pd.DataFrame) -> pd.DataFrame:
         """Generate Amazon order URLs using vectorized operations."""
-        df = df.copy()
-        df['Order URL'] = AMAZON_ORDER_URL_TEMPLATE.format(
-            df[INPUT_COLUMNS['ORDER_ID']].iloc[0] if len(df) > 0 else ''
-        )
-        
-        # Use vectorized string operation for all rows
-        df['Order URL'] = df[INPUT_COLUMNS['ORDER_ID']].apply(
-            lambda x: AMAZON_ORDER_URL_TEMPLATE.format(x)
-        )
+        # Add the column in place; both pipelines pass in frames they built themselves.
+        # Order IDs are already strings (string[pyarrow] when loaded), so concat directly.
+        df['Order URL'] = AMAZON_ORDER_URL_PREFIX + df[INPUT_COLUMNS['ORDER_ID']]
         
         return df
     
     def sort_by_date(self, df: pd.DataFrame) -> pd.DataFrame:
         """Sort transactions by date (most recent first)."""
-        return df.sort_values(
-            INPUT_COLUMNS['SHIP_DATE'], 
-            ascending=False
-        ).reset_index(drop=True)
+        # Sort on the raw int64 timestamps; NaT is the smallest int64 so it lands last
+        timestamps = df[INPUT_COLUMNS['SHIP_DATE']].to_numpy(dtype='datetime64[ns]').view('i8')
+        
+        # Stable descending order: argsort the reversed array, then map indices back
+        order = len(timestamps) - 1 - np.argsort(timestamps[::-1], kind='stable')[::-1]
+        
+        return df.iloc[order].reset_index(drop=True)
     
     def process(self, input_file: str | Path) -> pd.DataFrame:
         """Complete processing pipeline."""
         self.logger.info("Starting order history processing...")
         
-        # Load and clean data
-        self.load_csv(input_file)
-        self.clean_data()
+        # Load and clean data block by block to keep peak memory down
+        self.load_clean_csv(input_file)
         
         # Process transactions
         grouped_df = self.group_transactions()
@@ -143,12 +251,12 @@ class OrderHistoryProcessor:
         # Generate URLs
         url_df = self.generate_order_urls(grouped_df)
         
-        # Calculate Order Total for each Order ID (sum of all Total Owed for that order)
-        order_totals = self.df.groupby(INPUT_COLUMNS['ORDER_ID'])[INPUT_COLUMNS['TOTAL_OWED']].sum().reset_index()
-        order_totals = order_totals.rename(columns={INPUT_COLUMNS['TOTAL_OWED']: 'Order Total'})
-        
-        # Merge Order Total back into the grouped data
-        url_df = url_df.merge(order_totals, left_on=INPUT_COLUMNS['ORDER_ID'], right_on=INPUT_COLUMNS['ORDER_ID'], how='left')
+        # Calculate Order Total for each Order ID (sum of all Total Owed for that order).
+        # Each transaction already sums its items' Total Owed, so total the grouped rows
+        # in place instead of re-scanning every item row and merging the result back.
+        url_df['Order Total'] = url_df.groupby(
+            INPUT_COLUMNS['ORDER_ID'], sort=False
+        )['Transaction Amount'].transform('sum')
         
         # Sort by date
         final_df = self.sort_by_date(url_df)
@@ -162,7 +270,7 @@ class OrderHistoryProcessor:
         })
         
         # Format Ship Date to YYYY-MM-DD format (drop time)
-        output_df['Ship Date'] = output_df['Ship Date'].dt.strftime('%Y-%m-%d')
+        output_df['Ship Date'] = output_df['Ship Date'].dt.strftime(OUTPUT_DATE_FORMAT)
         
         # Format Transaction Amount to two decimal places
         output_df['Transaction Amount'] = output_df['Transaction Amount'].round(2).map('{:.2f}'.format)
@@ -183,10 +291,11 @@ class OrderHistoryProcessor:
         
         self.logger.info(f"Saving results to {output_file}")
         
-        self.processed_df.to_csv(
+        # Write with Arrow's C++ CSV writer (UTF-8, header included)
+        pa_csv.write_csv(
+            pa.Table.from_pandas(self.processed_df, preserve_index=False),
             output_file,
-            index=False,
-            encoding='utf-8'
+            write_options=pa_csv.WriteOptions(include_header=True)
         )
         
         self.logger.info("Save complete")
@@ -321,7 +430,7 @@ class OrderHistoryProcessor:
         returns_with_urls = self.generate_order_urls(returns_with_products)
         
         # Format dates and amounts
-        returns_with_urls['Ship Date'] = returns_with_urls['Ship Date'].dt.strftime('%Y-%m-%d')
+        returns_with_urls['Ship Date'] = returns_with_urls['Ship Date'].dt.strftime(OUTPUT_DATE_FORMAT)
         returns_with_urls['Transaction Amount'] = returns_with_urls['Transaction Amount'].round(2).map('{:.2f}'.format)
         returns_with_urls['Order Total'] = returns_with_urls['Order Total'].round(2).map('{:.2f}'.format)
         
@@ -342,11 +451,11 @@ class OrderHistoryProcessor:
         combined_df = pd.concat([self.processed_df, returns_df], ignore_index=True)
         
         # Sort by Ship Date (most recent first)
-        combined_df['Ship Date'] = pd.to_datetime(combined_df['Ship Date'])
+        combined_df['Ship Date'] = pd.to_datetime(combined_df['Ship Date'], format=OUTPUT_DATE_FORMAT)
         combined_df = combined_df.sort_values('Ship Date', ascending=False).reset_index(drop=True)
         
         # Convert Ship Date back to string format
-        combined_df['Ship Date'] = combined_df['Ship Date'].dt.strftime('%Y-%m-%d')
+        combined_df['Ship Date'] = combined_df['Ship Date'].dt.strftime(OUTPUT_DATE_FORMAT)
         
         self.logger.info(f"Combined {len(self.processed_df)} orders with {len(returns_df)} returns = {len(combined_df)} total transactions")
         
@@ -1,6 +1,7 @@
 """Tests for the OrderHistoryProcessor class."""
 
 import pytest
+import numpy as np
 import pandas as pd
 import tempfile
 from pathlib import Path
@@ -19,6 +20,16 @@ Amazon.com,111-1111111-1111111,2025-08-04T20:39:52Z,Not Applicable,USD,0.99,0,0,
 Amazon.com,222-2222222-2222222,2025-08-03T15:30:00Z,Not Applicable,USD,25.99,0,0,0,25.99,25.99,0,B123456789,New,1,Visa - 111,Closed,Shipped,2025-08-04T10:00:00Z,standard,Test Address,Test Address,CARRIER456,Wireless Headphones,Not Available,Not Available,Not Available,Not Available"""
 
 
+@pytest.fixture
+def multiline_csv_file(sample_csv_data, tmp_path):
+    """Large CSV (over Arrow's 1 MiB default block) whose quoted Gift Message cells span two lines."""
+    lines = sample_csv_data.split('\n')
+    multiline_row = lines[2].replace('Organic Red Onion,Not Available', 'Organic Red Onion,"Happy\nBirthday"')
+    csv_path = tmp_path / 'multiline.csv'
+    csv_path.write_text('\n'.join([lines[0]] + [multiline_row] * 4000))
+    return csv_path
+
+
 @pytest.fixture
 def processor():
     """Create a new OrderHistoryProcessor instance for each test."""
@@ -48,6 +59,26 @@ class TestOrderHistoryProcessor:
         assert 'Product Name' in df.columns
         assert 'Shipment Item Subtotal' in df.columns
     
+    def test_load_csv_missing_optional_column(self, processor, sample_csv_data, tmp_path):
+        """Test that a CSV without an optional typed column (Website) still loads."""
+        rows = [line.split(',', 1)[1] for line in sample_csv_data.split('\n')]
+        csv_path = tmp_path / 'orders.csv'
+        csv_path.write_text('\n'.join(rows))
+        
+        df = processor.load_csv(csv_path)
+        
+        assert df.shape == (3, 27)
+        assert 'Website' not in df.columns
+        assert df['Order ID'].dtype == 'string[pyarrow]'
+    
+    def test_load_csv_multiline_quoted_cell(self, processor, multiline_csv_file):
+        """Test that a quoted cell containing a line break stays in one row."""
+        df = processor.load_csv(multiline_csv_file)
+        
+        assert len(df) == 4000
+        assert (df['Gift Message'] == 'Happy\nBirthday').all()
+        assert (df['Product Name'] == 'Organic Red Onion').all()
+    
     def test_load_csv_nonexistent_file(self, processor):
         """Test loading a non-existent file raises appropriate error."""
         with pytest.raises(FileNotFoundError):
@@ -72,6 +103,105 @@ class TestOrderHistoryProcessor:
         for col in required_columns:
             assert not cleaned_df[col].isna().any()
     
+    def test_load_clean_csv_matches_load_then_clean(self, processor, sample_csv_file):
+        """Test that streaming in small blocks gives the same rows as loading then cleaning."""
+        processor.load_csv(sample_csv_file)
+        expected_df = processor.clean_data().reset_index(drop=True)
+        
+        streamed_df = OrderHistoryProcessor().load_clean_csv(sample_csv_file, block_size=512)
+        
+        pd.testing.assert_frame_equal(streamed_df, expected_df[streamed_df.columns])
+    
+    def test_load_clean_csv_multiline_quoted_cell(self, processor, multiline_csv_file):
+        """Test that streaming in small blocks keeps quoted multi-line cells within one row."""
+        df = processor.load_clean_csv(multiline_csv_file, block_size=64 * 1024)
+        
+        assert len(df) == 4000
+        assert (df['Product Name'] == 'Organic Red Onion').all()
+    
+    def test_load_clean_csv_missing_required_column(self, processor, sample_csv_data, tmp_path):
+        """Test that a CSV without a required column raises instead of dropping every row."""
+        csv_path = tmp_path / 'orders.csv'
+        csv_path.write_text(sample_csv_data.replace('Product Name', 'Item Name', 1))
+        
+        with pytest.raises(KeyError, match='Product Name'):
+            processor.load_clean_csv(csv_path)
+    
+    def test_clean_data_parses_amounts_like_to_numeric(self, processor):
+        """Test that amount strings parse to the same floats/NaN as pd.to_numeric(errors='coerce')."""
+        amounts = ['Not Available', ' 7.5 ', '1e2', '-5.00', '', None]
+        processor.df = pd.DataFrame({
+            INPUT_COLUMNS['ORDER_ID']: ['111'] * len(amounts),
+            INPUT_COLUMNS['SHIP_DATE']: ['2025-08-05T03:08:19Z'] * len(amounts),
+            INPUT_COLUMNS['TOTAL_OWED']: ['1.00'] * len(amounts),
+            INPUT_COLUMNS['SHIPMENT_SUBTOTAL']: ['1.00'] * len(amounts),
+            INPUT_COLUMNS['PRODUCT_NAME']: ['Widget'] * len(amounts),
+            INPUT_COLUMNS['UNIT_PRICE']: amounts,
+        }, dtype='string[pyarrow]')
+        
+        cleaned_df = processor.clean_data()
+        
+        expected = pd.to_numeric(pd.Series(amounts, dtype=object), errors='coerce')
+        assert cleaned_df[INPUT_COLUMNS['UNIT_PRICE']].dtype == 'float64'
+        np.testing.assert_array_equal(cleaned_df[INPUT_COLUMNS['UNIT_PRICE']].to_numpy(), expected.to_numpy())
+        np.testing.assert_array_equal(expected.to_numpy(), [np.nan, 7.5, 100.0, -5.0, np.nan, np.nan])
+    
+    def test_parse_ship_dates(self, processor):
+        """Test ship date parsing across the ISO 8601 forms Amazon uses and invalid values."""
+        ship_dates = pd.Series([
+            '2025-08-04T10:00:00Z',
+            '2025-08-05T03:08:19.087Z',
+            '2025-08-05T05:08:19+02:00',
+            '2025-08-06T03:08:19',
+            '2025-08-07',
+            'Not Available',
+            None,
+        ], dtype='string[pyarrow]', index=range(10, 17), name='Ship Date')
+        
+        parsed = processor._parse_ship_dates(ship_dates)
+        
+        expected = pd.Series(pd.to_datetime([
+            '2025-08-04T10:00:00Z',
+            '2025-08-05T03:08:19.087Z',
+            '2025-08-05T03:08:19Z',
+            '2025-08-06T03:08:19Z',
+            '2025-08-07T00:00:00Z',
+            None,
+            None,
+        ], format='ISO8601', utc=True), index=range(10, 17), name='Ship Date')
+        pd.testing.assert_series_equal(parsed, expected)
+    
+    def test_parse_ship_dates_falls_back_to_pandas(self, processor):
+        """Test that a zoned date Arrow can't cast (out of range) is coerced by pandas instead."""
+        ship_dates = pd.Series(['2025-13-45T00:00:00Z', '2025-08-04T10:00:00Z'], dtype='string[pyarrow]')
+        
+        parsed = processor._parse_ship_dates(ship_dates)
+        
+        assert pd.isna(parsed.iloc[0])
+        assert parsed.iloc[1] == pd.Timestamp('2025-08-04T10:00:00Z')
+    
+    def test_clean_data_twice(self, processor, sample_csv_file):
+        """Test that cleaning already-cleaned data leaves it unchanged."""
+        processor.load_csv(sample_csv_file)
+        cleaned_df = processor.clean_data().copy()
+        
+        pd.testing.assert_frame_equal(processor.clean_data(), cleaned_df)
+    
+    def test_clean_data_numeric_amounts(self, processor):
+        """Test that amount columns that are already numeric fall back to pd.to_numeric."""
+        processor.df = pd.DataFrame({
+            INPUT_COLUMNS['ORDER_ID']: pd.array(['111', '222'], dtype='string[pyarrow]'),
+            INPUT_COLUMNS['SHIP_DATE']: pd.array(['2025-08-05T03:08:19Z', '2025-08-04T10:00:00Z'], dtype='string[pyarrow]'),
+            INPUT_COLUMNS['TOTAL_OWED']: [13.99, np.nan],
+            INPUT_COLUMNS['SHIPMENT_SUBTOTAL']: pd.Series(['13.99', 25.99], dtype=object),
+            INPUT_COLUMNS['PRODUCT_NAME']: pd.array(['Beef', 'Onion'], dtype='string[pyarrow]'),
+        })
+        
+        cleaned_df = processor.clean_data()
+        
+        assert cleaned_df[INPUT_COLUMNS['TOTAL_OWED']].tolist() == [13.99]
+        assert cleaned_df[INPUT_COLUMNS['SHIPMENT_SUBTOTAL']].tolist() == [13.99]
+    
     def test_group_transactions(self, processor, sample_csv_file):
         """Test transaction grouping functionality."""
         processor.load_csv(sample_csv_file)
@@ -88,6 +218,26 @@ class TestOrderHistoryProcessor:
             assert 'Beef Chuck Roast' in first_group['Product Name']
             assert 'Organic Red Onion' in first_group['Product Name']
     
+    def test_group_transactions_skips_missing_keys(self, processor):
+        """Test that rows missing a group key are dropped rather than decoded into another order."""
+        processor.df = pd.DataFrame({
+            INPUT_COLUMNS['ORDER_ID']: pd.array(['A', 'B', 'B', None, 'C'], dtype='string[pyarrow]'),
+            INPUT_COLUMNS['SHIPMENT_SUBTOTAL']: [np.nan, 2.0, 2.0, 3.0, 2.0],
+            INPUT_COLUMNS['SHIP_DATE']: pd.to_datetime(['2025-08-01', '2025-08-02', '2025-08-02', '2025-08-03', '2025-08-04'], utc=True),
+            INPUT_COLUMNS['PRODUCT_NAME']: pd.array(['Apple', 'Banana', 'Bread', 'Orphan', 'Cherry'], dtype='string[pyarrow]'),
+            INPUT_COLUMNS['TOTAL_OWED']: [1.0, 2.0, 3.0, 4.0, 5.0],
+        })
+        
+        grouped_df = processor.group_transactions()
+        
+        result = grouped_df[[
+            INPUT_COLUMNS['ORDER_ID'],
+            INPUT_COLUMNS['SHIPMENT_SUBTOTAL'],
+            INPUT_COLUMNS['PRODUCT_NAME'],
+            'Transaction Amount'
+        ]].astype(object).values.tolist()
+        assert result == [['B', 2.0, 'Banana; Bread', 5.0], ['C', 2.0, 'Cherry', 5.0]]
+    
     def test_generate_order_urls(self, processor):
         """Test order URL generation."""
         # Create simple test DataFrame
@@ -121,6 +271,17 @@ class TestOrderHistoryProcessor:
         actual_order = sorted_df[INPUT_COLUMNS['ORDER_ID']].tolist()
         assert actual_order == expected_order
     
+    def test_sort_by_date_keeps_tied_rows_in_order(self, processor):
+        """Test that transactions sharing a date keep their original order."""
+        test_df = pd.DataFrame({
+            INPUT_COLUMNS['SHIP_DATE']: pd.to_datetime(['2025-08-04', '2025-08-05', '2025-08-04', '2025-08-05'], utc=True),
+            INPUT_COLUMNS['ORDER_ID']: ['333', '111', '444', '222'],
+        })
+        
+        sorted_df = processor.sort_by_date(test_df)
+        
+        assert sorted_df[INPUT_COLUMNS['ORDER_ID']].tolist() == ['111', '222', '333', '444']
+    
     def test_process_end_to_end(self, processor, sample_csv_file):
         """Test complete processing pipeline."""
         result_df = processor.process(sample_csv_file)
@@ -140,6 +301,18 @@ class TestOrderHistoryProcessor:
         assert all(result_df['Order URL'].str.contains('amazon.com'))
         assert all(result_df['Order URL'].str.contains('orderID='))
     
+    def test_process_order_total_spans_shipments(self, processor, sample_csv_data, tmp_path):
+        """Test that Order Total sums every shipment of an order."""
+        extra_row = "Amazon.com,111-1111111-1111111,2025-08-04T20:39:52Z,Not Applicable,USD,5.00,0,0,0,5.00,5.00,0,B000000001,New,1,Visa - 111,Closed,Shipped,2025-08-06T09:00:00Z,standard,Test Address,Test Address,CARRIER789,Watermelon,Not Available,Not Available,Not Available,Not Available"
+        csv_path = tmp_path / 'orders.csv'
+        csv_path.write_text(sample_csv_data + '\n' + extra_row)
+        
+        result_df = processor.process(csv_path)
+        order_rows = result_df[result_df['Order ID'] == '111-1111111-1111111']
+        
+        assert sorted(order_rows['Transaction Amount']) == ['14.98', '5.00']
+        assert order_rows['Order Total'].tolist() == ['19.98', '19.98']
+    
     def test_save_csv(self, processor, sample_csv_file):
         """Test CSV saving functionality."""
         processor.process(sample_csv_file)